@@ -62,8 +62,8 @@ class Base_Accessor():
 
         aligned_index = index_fns.align_to(obj.index, other.index)
         aligned_columns = index_fns.align_to(obj.columns, other.columns)
-        obj = obj.iloc[aligned_index, aligned_columns]
-        return self.wrap_array(obj.values, index=other.index, columns=other.columns)
+        aligned = obj.values[aligned_index][:, aligned_columns]
+        return self.wrap_array(aligned, index=other.index, columns=other.columns)
 
     @class_or_instancemethod
     def broadcast(self_or_cls, *others, **kwargs):
@@ -1,14 +1,50 @@
+import hashlib
+import weakref
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
+from numba import njit
 
 from vectorbt.utils import checks
 
 
+@njit(cache=True)
+def is_homogeneous_nb(a):
+    """Check for each row whether all its elements are equal to the first one."""
+    b = np.empty(a.shape[0], dtype=np.bool_)
+    for i in range(a.shape[0]):
+        b[i] = True
+        for j in range(1, a.shape[1]):
+            if a[i, j] != a[i, 0]:
+                b[i] = False
+                break
+    return b
+
+
 def from_values(values, name=None, value_names=None):
     """Create index using array of values."""
     if value_names is not None:
         checks.assert_same_shape(values, value_names, along_axis=0)
         return pd.Index(value_names, name=name)  # just return the names
+    # Stack values only if this does not convert any of them to another type
+    arr = None
+    if len({v.dtype if checks.is_array(v) else type(v) for v in values}) == 1:
+        try:
+            arr = np.asarray(values)
+        except ValueError:
+            pass  # ragged values
+    if arr is not None and arr.dtype.kind in 'iufbc' and arr.ndim > 0:
+        if arr.ndim == 1:
+            # Each value is a scalar
+            return pd.Index(arr, name=name)
+        arr = arr.reshape((arr.shape[0], -1))
+        is_homogeneous = is_homogeneous_nb(arr)
+        value_names = arr[:, 0].astype(object)
+        mix_idxs = np.flatnonzero(~is_homogeneous)
+        value_names[mix_idxs] = ['mix_%d' % i for i in mix_idxs]
+        return pd.Index(value_names.tolist(), name=name)
+
+    # Fall back to checking each value separately
     value_names = []
     for i, v in enumerate(values):
         if not checks.is_array(v):
@@ -24,70 +60,126 @@ def repeat(index, n):
     """Repeat each element in index n times."""
     if not isinstance(index, pd.Index):
         index = pd.Index(index)
+    if n == 1:
+        return index
 
-    return np.repeat(index, n)
+    if isinstance(index, pd.MultiIndex):
+        # Repeat codes instead of tuples
+        codes = [np.repeat(level_codes, n) for level_codes in index.codes]
+        return pd.MultiIndex(levels=index.levels, codes=codes, names=index.names, verify_integrity=False)
+    return index.repeat(n)
 
 
 def tile(index, n):
     """Tile the whole index n times."""
     if not isinstance(index, pd.Index):
         index = pd.Index(index)
+    if n == 1:
+        return index
 
     if isinstance(index, pd.MultiIndex):
-        return pd.MultiIndex.from_tuples(np.tile(index, n), names=index.names)
-    return pd.Index(np.tile(index, n), name=index.name)
+        # Tile codes instead of tuples
+        codes = [np.tile(level_codes, n) for level_codes in index.codes]
+        return pd.MultiIndex(levels=index.levels, codes=codes, names=index.names, verify_integrity=False)
+    return pd.Index(np.tile(index.to_numpy(copy=False), n), name=index.name, dtype=index.dtype)
 
 
 def stack(*indexes):
     """Stack indexes."""
-    new_index = indexes[0]
-    for i in range(1, len(indexes)):
-        index1, index2 = new_index, indexes[i]
-        checks.assert_same_shape(index1, index2)
-        if not isinstance(index1, pd.MultiIndex):
-            index1 = pd.MultiIndex.from_arrays([index1])
-        if not isinstance(index2, pd.MultiIndex):
-            index2 = pd.MultiIndex.from_arrays([index2])
-
-        levels = []
-        for i in range(len(index1.names)):
-            levels.append(index1.get_level_values(i))
-        for i in range(len(index2.names)):
-            levels.append(index2.get_level_values(i))
+    if len(indexes) == 1:
+        return indexes[0]
+    levels = []
+    for index in indexes:
+        checks.assert_same_shape(indexes[0], index)
+        if not isinstance(index, pd.MultiIndex):
+            index = pd.MultiIndex.from_arrays([index])
+        for i in range(len(index.names)):
+            levels.append(index.get_level_values(i))
+    return pd.MultiIndex.from_arrays(levels)
 
-        new_index = pd.MultiIndex.from_arrays(levels)
-    return new_index
 
+@njit(cache=True)
+def repeat_tile_nb(a, reps, tiles):
+    """Repeat each element of the array `reps` times and tile the result `tiles` times."""
+    n = a.shape[0]
+    b = np.empty(n * reps * tiles, dtype=a.dtype)
+    for t in range(tiles):
+        base = t * n * reps
+        for i in range(n):
+            for r in range(reps):
+                b[base + i * reps + r] = a[i]
+    return b
 
-def combine(*indexes):
-    """Combine indexes using Cartesian product."""
-    new_index = indexes[0]
-    for i in range(1, len(indexes)):
-        index1, index2 = new_index, indexes[i]
-        if not isinstance(index1, pd.Index):
-            index1 = pd.Index(index1)
-        if not isinstance(index2, pd.Index):
-            index2 = pd.Index(index2)
 
-        if len(index1) == 1:
-            return index2
-        elif len(index2) == 1:
-            return index1
+_combine_cache = OrderedDict()
+_combine_cache_size = 128
 
-        tuples1 = np.repeat(index1.to_numpy(), len(index2))
-        tuples2 = np.tile(index2.to_numpy(), len(index1))
 
-        if isinstance(index1, pd.MultiIndex):
-            index1 = pd.MultiIndex.from_tuples(tuples1, names=index1.names)
-        else:
-            index1 = pd.Index(tuples1, name=index1.name)
-        if isinstance(index2, pd.MultiIndex):
-            index2 = pd.MultiIndex.from_tuples(tuples2, names=index2.names)
+def combine(*indexes):
+    """Combine indexes using Cartesian product.
+
+    If all indexes are pandas indexes, the result is cached by their identity and names
+    until any of the indexes is collected or the result is among the least recently used
+    once the cache is full. Results that are one of the indexes are not cached. Each call
+    returns a shallow copy of the cached result, so changing its names in place does not
+    affect other callers."""
+    if all(isinstance(index, pd.Index) for index in indexes):
+        cache_key = tuple((id(index), tuple(index.names)) for index in indexes)
+        if cache_key in _combine_cache:
+            index_refs, new_index = _combine_cache[cache_key]
+            # Make sure that the ids have not been reused by other objects
+            if all(ref() is index for ref, index in zip(index_refs, indexes)):
+                _combine_cache.move_to_end(cache_key)
+                return new_index.copy()
+        new_index = _combine(indexes)
+        if any(new_index is index for index in indexes):
+            # Caching it would keep the index alive
+            return new_index
+
+        # Evict the result as soon as any of the indexes is collected
+        def evict(_, cache=_combine_cache, key=cache_key):
+            cache.pop(key, None)
+
+        index_refs = [weakref.ref(index, evict) for index in indexes]
+        _combine_cache[cache_key] = (index_refs, new_index)
+        if len(_combine_cache) > _combine_cache_size:
+            _combine_cache.popitem(last=False)
+        return new_index.copy()
+    return _combine(indexes)
+
+
+def _combine(indexes):
+    indexes = [index if isinstance(index, pd.Index) else pd.Index(index) for index in indexes]
+    size = 1
+    for i, index in enumerate(indexes):
+        if i > 0:
+            if size == 1:
+                return index
+            elif len(index) == 1:
+                indexes = indexes[:i]
+                break
+        size *= len(index)
+    if len(indexes) == 1:
+        return indexes[0]
+
+    # Each index is repeated by the size of the indexes to its right and tiled by the size to its left
+    # Only codes are repeated and tiled, levels are taken over from the (small) input indexes
+    levels = []
+    codes = []
+    names = []
+    tiles = 1
+    for index in indexes:
+        # If any index is empty, so is the product: all codes become empty
+        reps = size // (tiles * len(index)) if size > 0 else 0
+        if isinstance(index, pd.MultiIndex):
+            index = index.remove_unused_levels()
         else:
-            index2 = pd.Index(tuples2, name=index2.name)
-
-        new_index = stack(index1, index2)
-    return new_index
+            index = pd.MultiIndex.from_arrays([index])
+        levels.extend(index.levels)
+        codes.extend([repeat_tile_nb(np.asarray(level_codes), reps, tiles) for level_codes in index.codes])
+        names.extend(index.names)
+        tiles *= len(index)
+    return pd.MultiIndex(levels=levels, codes=codes, names=names, verify_integrity=False)
 
 
 def drop_levels(index, levels):
@@ -108,14 +200,10 @@ def drop_levels(index, levels):
 
 def rename_levels(index, name_dict):
     """Rename index/column levels."""
-    for k, v in name_dict.items():
-        if isinstance(index, pd.MultiIndex):
-            if k in index.names:
-                index = index.rename(v, level=k)
-        else:
-            if index.name == k:
-                index.name = v
-    return index
+    new_names = [name_dict.get(name, name) for name in index.names]
+    if new_names == list(index.names):
+        return index
+    return index.set_names(new_names)
 
 
 def select_levels(index, level_names):
@@ -123,12 +211,33 @@ def select_levels(index, level_names):
     checks.assert_type(index, pd.MultiIndex)
 
     if isinstance(level_names, (list, tuple)):
-        levels = [index.get_level_values(level_name) for level_name in level_names]
-        return pd.MultiIndex.from_arrays(levels)
+        # Reuse levels and codes of the index instead of materializing the values
+        positions = [index._get_level_number(level_name) for level_name in level_names]
+        return pd.MultiIndex(
+            levels=[index.levels[i] for i in positions],
+            codes=[index.codes[i] for i in positions],
+            names=[index.names[i] for i in positions],
+            verify_integrity=False
+        )
     else:
         return index.get_level_values(level_names)
 
 
+def is_default_range(index):
+    """Check whether index holds the values 0, 1, ..., n-1 in this order."""
+    if isinstance(index, pd.RangeIndex):
+        return index.start == 0 and index.step == 1
+    if len(index) <= 1:
+        return len(index) == 0 or index[0] == 0
+    arr = index.to_numpy()
+    if arr.dtype.kind not in 'iuf':
+        return (arr == np.arange(len(arr))).all()
+    if arr[0] != 0 or arr[-1] != len(arr) - 1:
+        return False
+    diff = np.diff(arr)
+    return diff.min() == 1 and diff.max() == 1
+
+
 def drop_redundant_levels(index):
     """Drop levels that have a single value."""
     if not isinstance(index, pd.Index):
@@ -141,9 +250,8 @@ def drop_redundant_levels(index):
         for i, level in enumerate(index.levels):
             if len(level) == 1:
                 levels_to_drop.append(i)
-            elif level.name is None and (level == np.arange(len(level))).all():  # basic range
-                if len(index.get_level_values(i)) == len(level):
-                    levels_to_drop.append(i)
+            elif level.name is None and len(index) == len(level) and is_default_range(level):
+                levels_to_drop.append(i)
         # Remove redundant levels only if there are some non-redundant levels left
         if len(levels_to_drop) < len(index.levels):
             return index.droplevel(levels_to_drop)
@@ -156,41 +264,86 @@ def drop_duplicate_levels(index, keep='last'):
         return index
     checks.assert_type(index, pd.MultiIndex)
 
-    levels = []
+    levels = {}
     levels_to_drop = []
     if keep == 'first':
         r = range(0, len(index.levels))
     elif keep == 'last':
         r = range(len(index.levels)-1, -1, -1)  # loop backwards
     for i in r:
-        level = (index.levels[i].name, tuple(index.get_level_values(i).to_numpy().tolist()))
-        if level not in levels:
-            levels.append(level)
-        else:
+        # Look up levels by name and a digest of their values, and compare values only on a match
+        level_values = index.get_level_values(i)
+        values = level_values.to_numpy()
+        if values.dtype.kind in 'iufb':
+            values = values.astype(np.float64)  # equal numbers of different types should match
+        hashed = pd.util.hash_array(values)
+        key = (index.levels[i].name, hashlib.blake2b(hashed.tobytes(), digest_size=16).digest())
+        if key not in levels:
+            levels[key] = [i]
+        elif any(level_values.equals(index.get_level_values(j)) for j in levels[key]):
             levels_to_drop.append(i)
+        else:
+            levels[key].append(i)
     return index.droplevel(levels_to_drop)
 
 
+@njit(cache=True)
+def searchsorted_merge_nb(a, v):
+    """Find indices where elements of sorted `v` should be inserted into sorted `a` to maintain order.
+
+    Equivalent to `np.searchsorted(a, v)` but walks both arrays only once."""
+    b = np.empty(v.shape[0], dtype=np.int64)
+    j = 0
+    for i in range(v.shape[0]):
+        while j < a.shape[0] and a[j] < v[i]:
+            j += 1
+        b[i] = j
+    return b
+
+
+def encode_codes(codes, sizes):
+    """Encode each combination of level codes as a single integer.
+
+    Returns None if the combinations do not fit into 64 bits."""
+    if np.prod(np.asarray(sizes, dtype=np.float64) + 1) >= 2 ** 63:
+        return None
+    keys = np.zeros(len(codes[0]), dtype=np.int64)
+    for level_codes, size in zip(codes, sizes):
+        keys *= size + 1
+        keys += np.asarray(level_codes, dtype=np.int64) + 1  # missing values have code -1
+    return keys
+
+
+_align_cache = {}
+
+
 def align_to(index1, index2):
     """Align the first index to the second one. 
 
-    Returns integer indexes of occurrences and None if aligning not needed.
+    Returns an array with the position in the first index for each element of the second one,
+    or a full slice if aligning is not needed. Both can be passed to `np.take` or used to index
+    NumPy arrays directly.
 
     The second one must contain all levels from the first (and can have some more)
     In all these levels, both must share the same elements.
-    Only then the first index can be broadcasted to the match the shape of the second one."""
+    Only then the first index can be broadcasted to the match the shape of the second one.
+
+    The sorting of the first index is cached for as long as the index is alive."""
+    if not isinstance(index1, pd.Index):
+        index1 = pd.Index(index1)
+    if not index1.is_unique:
+        raise ValueError("Duplicates index values are not allowed for the first index")
+    orig_index1 = index1
     if not isinstance(index1, pd.MultiIndex):
         index1 = pd.MultiIndex.from_arrays([index1])
     if not isinstance(index2, pd.MultiIndex):
         index2 = pd.MultiIndex.from_arrays([index2])
-    if index1.duplicated().any():
-        raise ValueError("Duplicates index values are not allowed for the first index")
 
     if pd.Index.equals(index1, index2):
-        return pd.IndexSlice[:]
+        return slice(None)
     if len(index1) <= len(index2):
         if len(index1) == 1:
-            return pd.IndexSlice[np.tile([0])]
+            return np.zeros(len(index2), dtype=np.intp)
         js = []
         for i in range(len(index1.names)):
             for j in range(len(index2.names)):
@@ -199,9 +352,27 @@ def align_to(index1, index2):
                         js.append(j)
                         break
         if len(index1.names) == len(js):
-            new_index = pd.MultiIndex.from_arrays([index2.get_level_values(j) for j in js])
-            xsorted = np.argsort(index1)
-            ypos = np.searchsorted(index1[xsorted], new_index)
-            return pd.IndexSlice[xsorted[ypos]]
-
-    raise ValueError("Indexes could not be aligned together")
\ No newline at end of file
+            # Both indexes share the same levels, thus their codes can be compared directly
+            sizes = list(map(len, index1.levels))
+            keys2 = encode_codes([index2.codes[j] for j in js], sizes)
+            if keys2 is None:
+                new_index = pd.MultiIndex.from_arrays([index2.get_level_values(j) for j in js])
+                xsorted = np.argsort(index1)
+                ypos = np.searchsorted(index1[xsorted], new_index)
+                return xsorted[ypos].astype(np.intp, copy=False)
+            cache_key = id(orig_index1)
+            if cache_key in _align_cache:
+                _, xsorted, sorted_keys1 = _align_cache[cache_key]
+            else:
+                keys1 = encode_codes(index1.codes, sizes)
+                xsorted = np.argsort(keys1, kind='stable')
+                sorted_keys1 = keys1[xsorted]
+                index_ref = weakref.ref(orig_index1, lambda _: _align_cache.pop(cache_key, None))
+                _align_cache[cache_key] = (index_ref, xsorted, sorted_keys1)
+            if (keys2[1:] >= keys2[:-1]).all():
+                ypos = searchsorted_merge_nb(sorted_keys1, keys2)
+            else:
+                ypos = np.searchsorted(sorted_keys1, keys2)
+            return xsorted[ypos].astype(np.intp, copy=False)
+
+    raise ValueError("Indexes could not be aligned together")
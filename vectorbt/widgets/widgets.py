@@ -7,19 +7,37 @@ import matplotlib.pyplot as plt
 from vectorbt.widgets.common import UpdatableFigureWidget, FigureWidget
 from vectorbt.utils import checks, reshape_fns
 from collections import namedtuple
+from functools import lru_cache
 
 
 # ############# Indicator ############# #
 
 
+@lru_cache(maxsize=32)
+def cmap_lut(cmap_name):
+    """Get a lookup table of 256 RGB colors sampled evenly from the colormap."""
+    cmap = plt.get_cmap(cmap_name)
+    return (np.asarray(cmap(np.linspace(0, 1, 256)))[:, :3] * 255).round().astype(np.uint8)
+
+
+def cmap_idx(value, value_range):
+    """Map `value_range` to the colormap lookup table and get the position of the value from that range.
+
+    Any value maps to the middle of the colormap if the range has zero width."""
+    width = value_range[1] - value_range[0]
+    norm_value = (value - value_range[0]) / width if width else 0.5
+    return min(int(min(1., max(0., norm_value)) * 256), 255)  # same binning as matplotlib
+
+
+def rgb_from_idx(cmap_name, idx):
+    """Get RGB of the color at position `idx` in the colormap lookup table."""
+    r, g, b = cmap_lut(cmap_name)[idx]
+    return f"rgb({r},{g},{b})"
+
+
 def rgb_from_cmap(cmap_name, value, value_range):
     """Map `value_range` to colormap and get RGB of the value from that range."""
-    if value_range[0] == value_range[1]:
-        norm_value = 0.5
-    else:
-        norm_value = (value - value_range[0]) / (value_range[1] - value_range[0])
-    cmap = plt.get_cmap(cmap_name)
-    return "rgb(%d,%d,%d)" % tuple(np.round(np.asarray(cmap(norm_value))[:3] * 255))
+    return rgb_from_idx(cmap_name, cmap_idx(value, value_range))
 
 
 class Indicator(UpdatableFigureWidget):
@@ -42,10 +60,11 @@ class Indicator(UpdatableFigureWidget):
 
         self._value_range = value_range
         self._cmap_name = cmap_name
+        self._last_value_range = None
+        self._last_cmap_idx = None
 
         super().__init__()
-        self.update_layout(width=500, height=300)
-        self.update_layout(**layout_kwargs)
+        self.update_layout(**{**dict(width=500, height=300), **layout_kwargs})
 
         # Add traces
         indicator = go.Indicator(
@@ -78,9 +97,15 @@ class Indicator(UpdatableFigureWidget):
         with self.batch_update():
             indicator = self.data[0]
             if self._value_range is not None:
-                indicator.gauge.axis.range = self._value_range
+                # Send only changes to the frontend
+                if self._value_range != self._last_value_range:
+                    indicator.gauge.axis.range = self._value_range
+                    self._last_value_range = self._value_range
                 if self._cmap_name is not None:
-                    indicator.gauge.bar.color = rgb_from_cmap(self._cmap_name, value, self._value_range)
+                    idx = cmap_idx(value, self._value_range)
+                    if idx != self._last_cmap_idx:
+                        indicator.gauge.bar.color = rgb_from_idx(self._cmap_name, idx)
+                        self._last_cmap_idx = idx
             indicator.delta.reference = indicator.value
             indicator.value = value
 
@@ -122,13 +147,15 @@ class Bar(UpdatableFigureWidget):
         self.update_layout(**layout_kwargs)
 
         # Add traces
+        traces = []
         for i, trace_name in enumerate(trace_names):
             bar = go.Bar(
                 x=x_labels,
                 name=trace_name
             )
             bar.update(**(trace_kwargs[i] if isinstance(trace_kwargs, (list, tuple)) else trace_kwargs))
-            self.add_trace(bar)
+            traces.append(bar)
+        self.add_traces(traces)
 
         if data is not None:
             self.update_data(data)
@@ -193,13 +220,15 @@ class Scatter(UpdatableFigureWidget):
         self.update_layout(**layout_kwargs)
 
         # Add traces
+        traces = []
         for i, trace_name in enumerate(trace_names):
             scatter = go.Scatter(
                 x=x_labels,
                 name=trace_name
             )
             scatter.update(**(trace_kwargs[i] if isinstance(trace_kwargs, (list, tuple)) else trace_kwargs))
-            self.add_trace(scatter)
+            traces.append(scatter)
+        self.add_traces(traces)
 
         if data is not None:
             self.update_data(data)
@@ -256,13 +285,15 @@ class Histogram(UpdatableFigureWidget):
         self.update_layout(**layout_kwargs)
 
         # Add traces
+        traces = []
         for i, trace_name in enumerate(trace_names):
             histogram = go.Histogram(
                 name=trace_name,
                 opacity=0.75 if len(trace_names) > 1 else 1
             )
             histogram.update(**(trace_kwargs[i] if isinstance(trace_kwargs, (list, tuple)) else trace_kwargs))
-            self.add_trace(histogram)
+            traces.append(histogram)
+        self.add_traces(traces)
 
         if data is not None:
             self.update_data(data)